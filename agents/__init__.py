@@ -1,6 +1,6 @@
 from .basic_agent import create_agent
 from .mcp_agent import create_dictionary_agent
 from .game_specific_agent import create_game_specific_agent
-from .specific_agents import get_agent, list_agents
+from .specific_agents import get_agent, list_agents, reset_agent_cache
 
-__all__ = ['create_agent', 'create_dictionary_agent', 'create_game_specific_agent', 'get_agent', 'list_agents']
+__all__ = ['create_agent', 'create_dictionary_agent', 'create_game_specific_agent', 'get_agent', 'list_agents', 'reset_agent_cache']
@@ -0,0 +1,23 @@
+"""
+Shared environment setup for the agent factories.
+"""
+import os
+import functools
+from dotenv import load_dotenv
+
+@functools.lru_cache(maxsize=1)
+def ensure_env():
+    """
+    Load the .env file once and validate the OpenRouter API key.
+    
+    Returns:
+        str: The OpenRouter API key
+    """
+    load_dotenv()
+    
+    # Get the OpenRouter API key
+    openrouter_api_key = os.environ.get("OPENROUTER_API_KEY")
+    if not openrouter_api_key:
+        raise ValueError("Please set the OPENROUTER_API_KEY environment variable in your .env file")
+    
+    return openrouter_api_key
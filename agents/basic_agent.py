@@ -1,6 +1,5 @@
-import os
 import textarena as ta
-from dotenv import load_dotenv
+from ._env import ensure_env
 
 def create_agent(model_name="anthropic/claude-3.7-sonnet:thinking"):
     """
@@ -12,15 +11,7 @@ def create_agent(model_name="anthropic/claude-3.7-sonnet:thinking"):
     Returns:
         agent: A configured OpenRouterAgent
     """
-    # Load environment variables
-    load_dotenv()
-    
-    # Get the OpenRouter API key
-    openrouter_api_key = os.environ.get("OPENROUTER_API_KEY")
-    if not openrouter_api_key:
-        raise ValueError("Please set the OPENROUTER_API_KEY environment variable in your .env file")
-    
-    # Set the OpenRouter API key
-    os.environ["OPENROUTER_API_KEY"] = openrouter_api_key
+    # Load environment variables and validate the API key (once per process)
+    ensure_env()
     
     return ta.agents.OpenRouterAgent(model_name=model_name)
@@ -1,34 +1,26 @@
 """
 Game-specific agent that adapts behavior based on the detected game type.
 """
-import os
 import re
-import json
+import asyncio
 import logging
 import textarena as ta
-from dotenv import load_dotenv
 
-# Import the dictionary module for Spelling Bee
-from dictionary import dictionary, EnglishDictionary
+from ._env import ensure_env
+from ._prompts import SPELLING_BEE_SYSTEM_PROMPT
 
-# Configure logging
-logging.basicConfig(
-    level=logging.DEBUG,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    force=True
-)
+# Configure logging (handlers and format are left to the application)
 logger = logging.getLogger('game_specific_agent')
-logger.setLevel(logging.DEBUG)
-
-# Add a console handler to make sure logs are displayed
-console_handler = logging.StreamHandler()
-console_handler.setLevel(logging.DEBUG)
-formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
-console_handler.setFormatter(formatter)
-logger.addHandler(console_handler)
+logger.setLevel(logging.INFO)
 
 # Import the existing functions from mcp_agent.py
-from .mcp_agent import extract_letters, find_words_with_dictionary, get_word_length_distribution
+from .mcp_agent import extract_letters, analyze_words_with_dictionary, format_words_by_length
+
+# Keywords identifying each game type, matched case-insensitively in a single pass
+_GAME_TYPE_RE = re.compile(
+    r"(?P<spelling_bee>spelling bee|allowed letters)|(?P<poker>poker|texas hold|cards:)",
+    re.IGNORECASE,
+)
 
 def detect_game_type(observation):
     """
@@ -40,21 +32,67 @@ def detect_game_type(observation):
     Returns:
         str: The detected game type ('spelling_bee', 'poker', or 'other')
     """
-    observation_lower = observation.lower()
+    # Scan the observation once; Spelling Bee keywords take precedence over Poker ones
+    game_type = 'other'
+    for match in _GAME_TYPE_RE.finditer(observation):
+        game_type = match.lastgroup
+        if game_type == 'spelling_bee':
+            break
     
-    # Check for Spelling Bee indicators
-    if 'spelling bee' in observation_lower or 'allowed letters' in observation_lower:
+    if game_type == 'spelling_bee':
         logger.info("Detected game type: Spelling Bee")
-        return 'spelling_bee'
-    
-    # Check for Poker indicators
-    if 'poker' in observation_lower or 'texas hold' in observation_lower or 'cards:' in observation_lower:
+    elif game_type == 'poker':
         logger.info("Detected game type: Poker")
-        return 'poker'
+    else:
+        logger.info("Detected game type: Other (unknown game)")
+    return game_type
+
+def _build_enhanced(observation, analysis, is_first_move):
+    """
+    Add word suggestions to a Spelling Bee observation, plus a strategic analysis on the first move.
     
-    # Default to other
-    logger.info("Detected game type: Other (unknown game)")
-    return 'other'
+    Args:
+        observation: The game state observation
+        analysis: The (words, words_by_length, distribution, max_length) tuple
+            from analyze_words_with_dictionary
+        is_first_move: Whether no moves have been played yet
+        
+    Returns:
+        str: The enhanced observation
+    """
+    _, words_by_length, word_distribution, max_length = analysis
+    
+    # Add the word suggestions, starting with the longest
+    parts = [
+        observation,
+        "\n\nHere are some possible words you can form with the available letters:\n",
+        format_words_by_length(words_by_length),
+    ]
+    
+    # For the first move, add a strategic analysis section
+    if is_first_move:
+        parts.append("\n\n# Strategic Analysis for Spelling Bee\n\n")
+        parts.append("Here's a breakdown of possible words by length:\n")
+        
+        # Add the word distribution
+        parts.extend(
+            f"- {length}-letter words: {count}\n"
+            for length, count in word_distribution.items()
+        )
+        
+        # Add strategy for longest words
+        max_length_words = words_by_length[max_length]
+        
+        parts.append(f"\n## Strategy for Longest Words ({max_length} letters)\n\n")
+        parts.append(f"There are {len(max_length_words)} words of maximum length {max_length}:\n")
+        parts.append(", ".join(max_length_words))
+        
+        if len(max_length_words) == 1:
+            parts.append("\n\nSince there is only one word of maximum length, you should play it immediately to win.")
+        elif len(max_length_words) == 2:
+            parts.append("\n\nSince there are only two words of maximum length, try to make your opponent play one of them, then you can play the other to win.")
+    
+    return "".join(parts)
 
 def create_game_specific_agent(model_name="anthropic/claude-3.7-sonnet"):
     """
@@ -64,34 +102,15 @@ def create_game_specific_agent(model_name="anthropic/claude-3.7-sonnet"):
         model_name: The model to use via OpenRouter
         
     Returns:
-        A function that processes observations and returns actions
+        A function that processes observations and returns actions. Its
+        agent_async attribute is an awaitable variant, so several agents can
+        be driven concurrently with asyncio.gather.
     """
-    # Load environment variables
-    load_dotenv()
-    logger.info("Loading environment variables")
-    
-    # Get the OpenRouter API key
-    openrouter_api_key = os.environ.get("OPENROUTER_API_KEY")
-    if not openrouter_api_key:
-        raise ValueError("Please set the OPENROUTER_API_KEY environment variable in your .env file")
-    
-    # Set the OpenRouter API key
-    os.environ["OPENROUTER_API_KEY"] = openrouter_api_key
-    
-    # Define system prompts for different game types
-    spelling_bee_system_prompt = """You are an expert Spelling Bee player. Your goal is to win the game as fast as possible.
-
-Below you will find the rules for the game. Always follow these rules. You will also get a list with valid words. It has all valid long words in it. Shorter words are truncated, but for the longest words, this list has all of the words that will be acceoted.
-Please assume that your opponent also has this list. That means, I want you to be strategic about it. For example, when the longest word length category has only one word in it (e.g. the longest possible word is 14 characters and there is only one 14 character word), and you are the first player to move, I want you to play this word immediately because then you will win (because the opponent has no word they can play).
-Likewise, when the longest word category has 2 words in it, I want you to try to make the opponent play one of them. Then, you can play the other word and will win (because there are then no words left for the opponent to play).
-Please make use of the word list and think about how you can use it strategically to make sure that you will win even if the opponent has the same word list."""
-    
-    poker_system_prompt = """You are playing Poker. Your strategy is to ALWAYS go all-in, regardless of your hand or the game state.
-When it's your turn to act, respond with "[ALL-IN]" or the appropriate command to go all-in for the specific poker variant being played."""
+    # Load environment variables and validate the API key (once per process)
+    ensure_env()
     
     # Create base Claude agents with different system prompts
-    spelling_bee_agent = ta.agents.OpenRouterAgent(model_name=model_name, system_prompt=spelling_bee_system_prompt)
-    poker_agent = ta.agents.OpenRouterAgent(model_name=model_name, system_prompt=poker_system_prompt)
+    spelling_bee_agent = ta.agents.OpenRouterAgent(model_name=model_name, system_prompt=SPELLING_BEE_SYSTEM_PROMPT)
     base_agent = ta.agents.OpenRouterAgent(model_name=model_name)  # No special system prompt for other games
     
     # Track the current game state across turns
@@ -111,8 +130,7 @@ When it's your turn to act, respond with "[ALL-IN]" or the appropriate command t
         nonlocal current_game_letters, current_game_type
         
         # Log the observation for debugging
-        logger.info("=" * 80)
-        logger.info("Processing observation...")
+        logger.debug("Processing observation...")
         
         # Detect the game type
         game_type = detect_game_type(observation)
@@ -139,12 +157,12 @@ When it's your turn to act, respond with "[ALL-IN]" or the appropriate command t
         nonlocal current_game_letters
         
         # Extract letters from the observation
-        logger.info("Attempting to extract game info for Spelling Bee...")
+        logger.debug("Attempting to extract game info for Spelling Bee...")
         letters = extract_letters(observation)
         
         # If we found letters in this observation, update our current game state
         if letters and len(letters) > 0:
-            logger.info(f"Updating current game letters: {letters}")
+            logger.debug("Updating current game letters: %s", letters)
             current_game_letters = letters
             
         # If we don't have letters yet, just pass the observation to Claude
@@ -153,85 +171,18 @@ When it's your turn to act, respond with "[ALL-IN]" or the appropriate command t
             return spelling_bee_agent(observation)
         
         # Find all possible words using dictionary
-        words = find_words_with_dictionary(current_game_letters)
-        logger.info(f"Found {len(words)} valid words using dictionary")
+        analysis = analyze_words_with_dictionary(current_game_letters)
+        logger.info(f"Found {len(analysis[0])} valid words using dictionary")
+        
+        # If we couldn't find any words, just pass the original observation to Claude
+        if not analysis[0]:
+            return spelling_bee_agent(observation)
         
         # Check if this is the first move (no previous moves in the observation)
         is_first_move = 'You are Player' in observation and '[Player' not in observation
         
-        # For the first move, add a strategic analysis section
-        if is_first_move and words:
-            # Get word length distribution
-            word_distribution = get_word_length_distribution(words)
-            
-            # Create a strategic analysis section
-            strategic_analysis = "\n\n# Strategic Analysis for Spelling Bee\n\n"
-            strategic_analysis += "Here's a breakdown of possible words by length:\n"
-            
-            # Add the word distribution
-            for length, count in sorted(word_distribution.items(), reverse=True):
-                strategic_analysis += f"- {length}-letter words: {count}\n"
-            
-            # Add strategy for longest words
-            max_length = max(word_distribution.keys()) if word_distribution else 0
-            max_length_words = [word for word in words if len(word) == max_length]
-            
-            strategic_analysis += f"\n## Strategy for Longest Words ({max_length} letters)\n\n"
-            strategic_analysis += f"There are {len(max_length_words)} words of maximum length {max_length}:\n"
-            strategic_analysis += ", ".join(max_length_words)
-            
-            if len(max_length_words) == 1:
-                strategic_analysis += "\n\nSince there is only one word of maximum length, you should play it immediately to win."
-            elif len(max_length_words) == 2:
-                strategic_analysis += "\n\nSince there are only two words of maximum length, try to make your opponent play one of them, then you can play the other to win."
-            
-            # Add the enhanced observation with word suggestions
-            enhanced_observation = observation + "\n\nHere are some possible words you can form with the available letters:\n"
-            
-            # Group words by length for better organization
-            words_by_length = {}
-            for word in words:
-                length = len(word)
-                if length not in words_by_length:
-                    words_by_length[length] = []
-                words_by_length[length].append(word)
-            
-            # Add words to the observation, starting with the longest
-            for length in sorted(words_by_length.keys(), reverse=True):
-                enhanced_observation += f"\n{length}-letter words: {', '.join(words_by_length[length][:10])}"
-                if len(words_by_length[length]) > 10:
-                    enhanced_observation += f" (and {len(words_by_length[length]) - 10} more)"
-            
-            # Add the strategic analysis
-            enhanced_observation += strategic_analysis
-            
-            # Pass the enhanced observation to Claude
-            return spelling_bee_agent(enhanced_observation)
-        
-        # For subsequent moves, add word suggestions
-        elif words:
-            # Add the enhanced observation with word suggestions
-            enhanced_observation = observation + "\n\nHere are some possible words you can form with the available letters:\n"
-            
-            # Group words by length for better organization
-            words_by_length = {}
-            for word in words:
-                length = len(word)
-                if length not in words_by_length:
-                    words_by_length[length] = []
-                words_by_length[length].append(word)
-            
-            # Add words to the observation, starting with the longest
-            for length in sorted(words_by_length.keys(), reverse=True):
-                enhanced_observation += f"\n{length}-letter words: {', '.join(words_by_length[length][:10])}"
-                if len(words_by_length[length]) > 10:
-                    enhanced_observation += f" (and {len(words_by_length[length]) - 10} more)"
-            
-            # Pass the enhanced observation to Claude
-            return spelling_bee_agent(enhanced_observation)
-        
-        # If we couldn't find any words, just pass the original observation to Claude
-        return spelling_bee_agent(observation)
+        # Pass the enhanced observation to Claude
+        return spelling_bee_agent(_build_enhanced(observation, analysis, is_first_move))
     
     def handle_poker(observation):
         """
@@ -245,16 +196,8 @@ When it's your turn to act, respond with "[ALL-IN]" or the appropriate command t
         """
         logger.info("Handling Poker game - always going all-in")
         
-        # First, let the poker agent generate a response
-        response = poker_agent(observation)
-        
-        # Look for all-in in the response
-        if '[all-in]' in response.lower():
-            # Return the response as-is if it already contains all-in
-            return response
-        else:
-            # Force an all-in response
-            return "[ALL-IN]"
+        # The strategy never depends on the game state, so no model call is needed
+        return "[ALL-IN]"
     
     def handle_other_game(observation):
         """
@@ -269,4 +212,19 @@ When it's your turn to act, respond with "[ALL-IN]" or the appropriate command t
         logger.info("Handling other game type using base Claude model")
         return base_agent(observation)
     
+    async def agent_async(observation):
+        """
+        Process the observation in a worker thread so callers can overlap agents.
+        
+        Calls for the same agent should not overlap, since they share game state.
+        
+        Args:
+            observation: The game state observation
+            
+        Returns:
+            str: The action to take
+        """
+        return await asyncio.to_thread(agent, observation)
+    
+    agent.agent_async = agent_async
     return agent
@@ -1,30 +1,162 @@
 import os
-import json
+import sys
 import re
-import random
-import traceback
+import pickle
+import functools
+import importlib.resources
+from collections import Counter
 import textarena as ta
-from dotenv import load_dotenv
 import logging
 
 # Import the dictionary module
 from dictionary import dictionary, EnglishDictionary
+from letter_masks import letter_mask
+from pickle_cache import write_pickle_atomic
+from ._env import ensure_env
+from ._prompts import SPELLING_BEE_SYSTEM_PROMPT
 
-# Configure logging
-logging.basicConfig(
-    level=logging.DEBUG,  # Set to DEBUG to ensure all messages are captured
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    force=True  # Force reconfiguration in case logging was already configured elsewhere
-)
+# Configure logging (handlers and format are left to the application)
 logger = logging.getLogger('mcp_agent')
-logger.setLevel(logging.DEBUG)  # Ensure the logger itself is set to DEBUG level
+logger.setLevel(logging.INFO)
+
+# Matches the "Allowed Letters: aehktvw" line of a Spelling Bee observation
+_ALLOWED_LETTERS_RE = re.compile(r"Allowed Letters:\s*([a-zA-Z]+)", re.IGNORECASE)
+
+def _build_letter_trie(words):
+    """
+    Build a trie over the distinct letters of each word, in alphabetical order.
+    
+    Each node maps a letter index (0-25, or 26 for any other character) to its
+    child node; the "$" key holds the words made of exactly the letters on the path.
+    
+    Args:
+        words: The words to index
+        
+    Returns:
+        dict: The root node of the trie
+    """
+    trie = {}
+    for word in words:
+        node = trie
+        mask = letter_mask(word)
+        index = 0
+        while mask:
+            if mask & 1:
+                node = node.setdefault(index, {})
+            mask >>= 1
+            index += 1
+        node.setdefault("$", []).append(word)
+    return trie
+
+def _walk_letter_trie(trie, allowed_mask):
+    """
+    Collect all words in the trie that only use letters from the allowed mask.
+    
+    Subtrees behind a disallowed letter are pruned, so at most 2^k nodes are
+    visited for k allowed letters.
+    
+    Args:
+        trie: The root node of the trie
+        allowed_mask: Bitmask of the allowed letters
+        
+    Returns:
+        list: Valid words that can be formed
+    """
+    # Walk iteratively and extend with whole buckets, rather than passing
+    # every word up through a chain of nested generators
+    words = []
+    stack = [trie]
+    while stack:
+        node = stack.pop()
+        for key, child in node.items():
+            if key == "$":
+                words.extend(child)
+            elif allowed_mask >> key & 1:
+                stack.append(child)
+    return words
+
+# On-disk copy of the letter trie, so later processes can skip rebuilding it
+_INDEX_CACHE_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".cache", "letter_trie.pkl"
+)
 
-# Add a console handler to make sure logs are displayed
-console_handler = logging.StreamHandler()
-console_handler.setLevel(logging.DEBUG)
-formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
-console_handler.setFormatter(formatter)
-logger.addHandler(console_handler)
+def _index_sources():
+    """Files the dictionary and its index are built from."""
+    data_dir = importlib.resources.files("textarena.utils.data")
+    return [
+        __file__,
+        sys.modules[EnglishDictionary.__module__].__file__,
+        sys.modules[letter_mask.__module__].__file__,
+        data_dir / "en_GB.dic",
+        data_dir / "en_US.dic",
+        data_dir / "en.aff",
+    ]
+
+def _load_letter_trie(words):
+    """
+    Load the letter trie from the on-disk cache, rebuilding and saving it if stale.
+    
+    The cache is stale if any source file is newer than it, or if it was built
+    from a different number of words.
+    
+    Args:
+        words: The normalized dictionary words
+        
+    Returns:
+        dict: The root node of the trie
+    """
+    if os.path.exists(_INDEX_CACHE_PATH):
+        try:
+            cache_mtime = os.path.getmtime(_INDEX_CACHE_PATH)
+            if all(os.path.getmtime(source) <= cache_mtime for source in _index_sources()):
+                with open(_INDEX_CACHE_PATH, "rb") as f:
+                    word_count, trie = pickle.load(f)
+                if word_count == len(words):
+                    return trie
+        except Exception as e:
+            logger.warning(f"Could not load cached dictionary index: {str(e)}")
+    
+    trie = _build_letter_trie(words)
+    
+    try:
+        write_pickle_atomic(_INDEX_CACHE_PATH, (len(words), trie))
+    except Exception as e:
+        logger.warning(f"Could not save dictionary index cache: {str(e)}")
+    
+    return trie
+
+# Normalize the dictionary to lowercase and index it once at import time
+_DICTIONARY_WORDS = tuple({word.lower() for word in dictionary.get_all_words()})
+_LETTER_TRIE = _load_letter_trie(_DICTIONARY_WORDS)
+
+@functools.lru_cache(maxsize=32)
+def _find_words_cached(allowed_mask):
+    """
+    Scan the dictionary once per unique set of allowed letters.
+    
+    words_by_length and distribution are ordered from the longest length to the
+    shortest. The returned containers are shared between callers and must not be
+    modified.
+    
+    Args:
+        allowed_mask: Bitmask of the allowed letters
+        
+    Returns:
+        tuple: (words, words_by_length, distribution, max_length)
+    """
+    # Only the branches for allowed letters are visited
+    words = tuple(sorted(_walk_letter_trie(_LETTER_TRIE, allowed_mask)))
+    
+    # Group words by length in the same pass so handlers don't rebuild it every turn
+    words_by_length = {}
+    for word in words:
+        words_by_length.setdefault(len(word), []).append(word)
+    
+    # Order the buckets from longest to shortest once, so renderers never re-sort them
+    words_by_length = {length: tuple(words_by_length[length]) for length in sorted(words_by_length, reverse=True)}
+    distribution = {length: len(bucket) for length, bucket in words_by_length.items()}
+    max_length = next(iter(distribution), 0)
+    return words, words_by_length, distribution, max_length
 
 class DictionaryAgent(ta.agents.OpenRouterAgent):
     """
@@ -53,55 +185,37 @@ class DictionaryAgent(ta.agents.OpenRouterAgent):
         Returns:
             The processed observation
         """
-        # Log the observation for debugging
-        print(">>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>")
-        print("Processing observation:")
-        print("<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<")
-        
-        # Log the first 5000 characters to quickly identify the format
-        print(f"First 5000 chars: {observation[:5000]}")
-        
         # Check if observation is empty or None
         if not observation:
-            print("Empty observation received")
+            logger.debug("Empty observation received")
             return observation
         
+        # Log the first 5000 characters to quickly identify the format
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Processing observation, first 5000 chars: %s", observation[:5000])
+        
         # Try to extract the allowed letters from the observation
         letters = extract_letters(observation)
         
         # Update the current game letters if we found them
         if letters:
-            print(f"Updating current game letters: {letters}")
+            logger.debug("Updating current game letters: %s", letters)
             self.current_game_letters = letters
         else:
-            print("No game letters available yet, passing observation to Claude as-is")
+            logger.debug("No game letters available yet, passing observation to Claude as-is")
         
         # If we have game letters, enhance the observation with word suggestions
         if self.current_game_letters:
             # Find words with dictionary
-            words = find_words_with_dictionary(self.current_game_letters)
+            words, words_by_length, _, _ = analyze_words_with_dictionary(self.current_game_letters)
             
             if words:
-                # Add the word suggestions to the observation
-                word_suggestions = "\n\nHere are some possible words you can form with the available letters:\n"
-                
-                # Group words by length for better organization
-                words_by_length = {}
-                for word in words:
-                    length = len(word)
-                    if length not in words_by_length:
-                        words_by_length[length] = []
-                    words_by_length[length].append(word)
-                
-                # Add words to the observation, starting with the longest
-                for length in sorted(words_by_length.keys(), reverse=True):
-                    word_suggestions += f"\n{length}-letter words: {', '.join(words_by_length[length][:10])}"
-                    if len(words_by_length[length]) > 10:
-                        word_suggestions += f" (and {len(words_by_length[length]) - 10} more)"
-                
-                # Add the word suggestions to the observation
-                enhanced_observation = observation + word_suggestions
-                return enhanced_observation
+                # Add the word suggestions to the observation, starting with the longest
+                return "".join([
+                    observation,
+                    "\n\nHere are some possible words you can form with the available letters:\n",
+                    format_words_by_length(words_by_length),
+                ])
         
         # If we don't have game letters or couldn't find words, just return the original observation
         return observation
@@ -116,28 +230,11 @@ def create_dictionary_agent(model_name="anthropic/claude-3.7-sonnet"):
     Returns:
         A function that processes observations and returns actions
     """
-    # Load environment variables
-    load_dotenv()
-    print("Loading environment variables")
-    
-    # Get the OpenRouter API key
-    openrouter_api_key = os.environ.get("OPENROUTER_API_KEY")
-    if not openrouter_api_key:
-        raise ValueError("Please set the OPENROUTER_API_KEY environment variable in your .env file")
-    
-    # Set the OpenRouter API key
-    os.environ["OPENROUTER_API_KEY"] = openrouter_api_key
-    
-    # Define a system prompt for the agent
-    system_prompt = """You are an expert Spelling Bee player. Your goal is to win the game as fast as possible.
-
-Below you will find the rules for the game. Always follow these rules. You will also get a list with valid words. It has all valid long words in it. Shorter words are truncated, but for the longest words, this list has all of the words that will be acceoted.
-Please assume that your opponent also has this list. That means, I want you to be strategic about it. For example, when the longest word length category has only one word in it (e.g. the longest possible word is 14 characters and there is only one 14 character word), and you are the first player to move, I want you to play this word immediately because then you will win (because the opponent has no word they can play).
-Likewise, when the longest word category has 2 words in it, I want you to try to make the opponent play one of them. Then, you can play the other word and will win (because there are then no words left for the opponent to play).
-Please make use of the word list and think about how you can use it strategically to make sure that you will win even if the opponent has the same word list."""
+    # Load environment variables and validate the API key (once per process)
+    ensure_env()
     
     # Create the base Claude agent with the system prompt
-    claude_agent = ta.agents.OpenRouterAgent(model_name=model_name, system_prompt=system_prompt)
+    claude_agent = ta.agents.OpenRouterAgent(model_name=model_name, system_prompt=SPELLING_BEE_SYSTEM_PROMPT)
     
     # Track the current game state across turns
     current_game_letters = None
@@ -155,38 +252,25 @@ Please make use of the word list and think about how you can use it strategicall
         nonlocal current_game_letters
         
         # Log the full observation to see its format
-        print("=" * 80)
-        print("INPUT OBSERVATION (START) >>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>")
-        print(observation)
-        print("INPUT OBSERVATION (END) <<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<")
-        print("=" * 80)
-        
-        # Log observation type and length for debugging
-        print(f"Observation type: {type(observation)}")
-        print(f"Observation length: {len(observation) if isinstance(observation, str) else 'not a string'}")
+        logger.debug("Input observation:\n%s", observation)
         
         # Extract letters from the observation
-        print("Attempting to extract game info...")
         letters = extract_letters(observation)
         
-        # Log the extraction results
-        if letters:
-            print(f"Successfully extracted letters: {letters}")
-        else:
-            print("Failed to extract letters from observation")
-            
         # If we found letters in this observation, update our current game state
         if letters and len(letters) > 0:
-            print(f"Updating current game letters: {letters}")
+            logger.debug("Updating current game letters: %s", letters)
             current_game_letters = letters
+        else:
+            logger.debug("Failed to extract letters from observation")
             
         # If we don't have letters yet, just pass the observation to Claude
         if not current_game_letters:
-            print("No game letters available yet, passing observation to Claude as-is")
+            logger.debug("No game letters available yet, passing observation to Claude as-is")
             return claude_agent(observation)
         
         # Find all possible words using dictionary
-        words = find_words_with_dictionary(current_game_letters)
+        words, words_by_length, word_distribution, max_length = analyze_words_with_dictionary(current_game_letters)
         logger.info(f"Found {len(words)} valid words using dictionary")
         
         # Check if this is the first move (no previous moves in the observation)
@@ -194,44 +278,40 @@ Please make use of the word list and think about how you can use it strategicall
         
         # For the first move, add a strategic analysis section
         if is_first_move and words:
-            # Get word length distribution
-            word_distribution = get_word_length_distribution(words)
-            
             # Create a strategic analysis section
-            strategic_analysis = "\n\n# Strategic Analysis for Spelling Bee\n\n"
-            strategic_analysis += "I need to analyze the word distribution carefully to develop a winning strategy:\n\n"
+            parts = [
+                observation,
+                "\n\n# Strategic Analysis for Spelling Bee\n\n",
+                "I need to analyze the word distribution carefully to develop a winning strategy:\n\n",
+            ]
             
             # Add distribution information
-            strategic_analysis += "## Word Length Distribution\n"
-            for length in sorted(word_distribution.keys(), reverse=True):
-                strategic_analysis += f"- {length}-letter words: {word_distribution[length]} words\n"
+            parts.append("## Word Length Distribution\n")
+            parts.extend(
+                f"- {length}-letter words: {word_distribution[length]} words\n"
+                for length in word_distribution
+            )
             
             # Add strategic insights
-            strategic_analysis += "\n## Strategic Insights\n"
+            parts.append("\n## Strategic Insights\n")
             
             # Check for special cases that lead to immediate wins
-            max_length = max(word_distribution.keys()) if word_distribution else 0
-            
             if max_length > 0 and word_distribution[max_length] == 1:
-                strategic_analysis += f"- There is only one word of maximum length ({max_length}). Playing it immediately would force a win.\n"
+                parts.append(f"- There is only one word of maximum length ({max_length}). Playing it immediately would force a win.\n")
             elif max_length > 0 and word_distribution[max_length] == 2:
-                strategic_analysis += f"- There are only two words of maximum length ({max_length}). I should try to make the opponent play one, then I can play the other to win.\n"
+                parts.append(f"- There are only two words of maximum length ({max_length}). I should try to make the opponent play one, then I can play the other to win.\n")
             else:
-                strategic_analysis += "- I should play shorter words first to force the opponent into playing longer words.\n"
-                strategic_analysis += "- This will eventually lead to a situation where the opponent has no valid moves.\n"
+                parts.append("- I should play shorter words first to force the opponent into playing longer words.\n")
+                parts.append("- This will eventually lead to a situation where the opponent has no valid moves.\n")
             
             # Add the strategic analysis to the observation
-            observation = observation + strategic_analysis
+            observation = "".join(parts)
         
         # Enhance the observation with the dictionary results
-        enhanced_observation = enhance_observation_with_word_results(observation, words)
+        enhanced_observation = enhance_observation_with_word_results(observation, words, words_by_length)
         
         # Log the enhanced observation
-        print("=" * 80)
-        print("ENHANCED OBSERVATION (START) >>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>")
-        print(enhanced_observation)
-        print("ENHANCED OBSERVATION (END) <<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<")
-        print("=" * 80)
+        logger.debug("Enhanced observation:\n%s", enhanced_observation)
         
         # Pass the enhanced observation to Claude
         response = claude_agent(enhanced_observation)
@@ -257,49 +337,44 @@ def extract_letters(observation):
         observation: The game state observation
         
     Returns:
-        A list of allowed letters, or None if not found
+        A frozenset of allowed (lowercase) letters, or None if not found
     """
-    print("Attempting to extract letters")
-    
-    # Look specifically for the "Allowed Letters: aehktvw" format
-    pattern = r"Allowed Letters: ([a-zA-Z]+)"
-    match = re.search(pattern, observation, re.IGNORECASE)
-    if match:
-        letters_str = match.group(1)
-        letters = [letter.lower() for letter in letters_str]
-        print(f"Extracted letters: {letters}")
-        return letters
-    else:
-        print(f"No match found for 'Allowed Letters:' format")
-        print(f"Regex pattern used: {pattern}")
-    
-    # If we couldn't match the pattern, return None
-    return None
+    match = _ALLOWED_LETTERS_RE.search(observation)
+    return frozenset(match.group(1).lower()) if match else None
 
 def find_words_with_dictionary(letters):
     """
     Use the dictionary to find all possible words.
     
     Args:
-        letters: List of available letters
+        letters: Iterable of available letters
         
     Returns:
         list: Valid words that can be formed
     """
-    logger.info(f"Finding words with dictionary: letters={letters}")
+    words, _, _, _ = analyze_words_with_dictionary(letters)
+    return list(words)
+
+def analyze_words_with_dictionary(letters):
+    """
+    Use the dictionary to find all possible words, grouped by length.
+    
+    Results are cached per letter set, so the returned containers are shared
+    between calls and must not be modified.
     
-    # Convert letters to lowercase for matching
-    letters = [letter.lower() for letter in letters]
+    Args:
+        letters: Iterable of available letters
+        
+    Returns:
+        tuple: (words, words_by_length, distribution, max_length)
+    """
+    logger.info(f"Finding words with dictionary: letters={letters}")
     
-    # Filter the dictionary to find valid words
-    valid_words = []
-    for word in dictionary:
-        # Check if the word can be formed using the available letters
-        if all(letter.lower() in letters for letter in word):
-            valid_words.append(word)
+    # Repeat lookups for the same letters (e.g. every turn of a game) hit the cache
+    analysis = _find_words_cached(letter_mask("".join(letters).lower()))
     
-    logger.info(f"Found {len(valid_words)} valid words using dictionary")
-    return valid_words
+    logger.info(f"Found {len(analysis[0])} valid words using dictionary")
+    return analysis
 
 def get_word_length_distribution(words):
     """
@@ -311,21 +386,17 @@ def get_word_length_distribution(words):
     Returns:
         dict: Dictionary mapping word length to count
     """
-    distribution = {}
-    for word in words:
-        length = len(word)
-        if length not in distribution:
-            distribution[length] = 0
-        distribution[length] += 1
-    return distribution
+    return Counter(len(word) for word in words)
 
-def enhance_observation_with_word_results(observation, words):
+def enhance_observation_with_word_results(observation, words, words_by_length=None):
     """
     Enhance the observation with word results.
     
     Args:
         observation: The original observation
         words: List of words found
+        words_by_length: Optional precomputed mapping of word length to words,
+            ordered from longest to shortest
         
     Returns:
         str: Enhanced observation
@@ -333,25 +404,33 @@ def enhance_observation_with_word_results(observation, words):
     if not words:
         return observation
     
-    # Add a section with word suggestions
-    enhanced_observation = observation + "\n\n"
-    enhanced_observation += "Here are some possible words you can form with the available letters:\n"
-    
     # Group words by length for better organization
-    words_by_length = {}
-    for word in words:
-        length = len(word)
-        if length not in words_by_length:
-            words_by_length[length] = []
-        words_by_length[length].append(word)
+    if words_by_length is None:
+        buckets = {}
+        for word in words:
+            buckets.setdefault(len(word), []).append(word)
+        words_by_length = {length: buckets[length] for length in sorted(buckets, reverse=True)}
     
-    # Add words to the observation, starting with the longest
-    for length in sorted(words_by_length.keys(), reverse=True):
-        word_list = words_by_length[length]
-        # Limit to 10 words per length to avoid overwhelming Claude
-        display_words = word_list[:10]
-        enhanced_observation += f"\n{length}-letter words: {', '.join(display_words)}"
-        if len(word_list) > 10:
-            enhanced_observation += f" (and {len(word_list) - 10} more)"
+    # Add a section with word suggestions, starting with the longest words
+    return "".join([
+        observation,
+        "\n\nHere are some possible words you can form with the available letters:\n",
+        format_words_by_length(words_by_length),
+    ])
+
+def format_words_by_length(words_by_length, limit=10):
+    """
+    Format word suggestions grouped by length, in the mapping's order.
     
-    return enhanced_observation
+    Args:
+        words_by_length: Mapping of word length to words, ordered from longest to shortest
+        limit: Maximum number of words to show per length, to avoid overwhelming Claude
+        
+    Returns:
+        str: One line per length, each prefixed with a newline
+    """
+    return "".join(
+        f"\n{length}-letter words: {', '.join(word_list[:limit])}"
+        + (f" (and {len(word_list) - limit} more)" if len(word_list) > limit else "")
+        for length, word_list in words_by_length.items()
+    )
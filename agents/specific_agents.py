@@ -3,17 +3,20 @@ Specific agent configurations for SpellingBee.
 Each agent has a predefined model_name, model_description, and agent implementation.
 """
 import threading
-import time
-import sys
-import os
-
-# Add the parent directory to sys.path to allow imports
-sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import functools
+from dataclasses import dataclass
+from typing import Callable
 
 from .basic_agent import create_agent
 from .mcp_agent import create_dictionary_agent
 from .game_specific_agent import create_game_specific_agent
-import mcp_server
+
+@dataclass(slots=True, frozen=True)
+class AgentSpec:
+    """Configuration of a specific agent: how to create it and how it is named online."""
+    create_fn: Callable
+    model_name: str
+    model_description: str
 
 # Dictionary of available specific agents
 SPECIFIC_AGENTS = {}
@@ -28,11 +31,11 @@ def register_agent(agent_id, create_fn, model_name, model_description):
         model_name: Name of the model for online competition
         model_description: Description of the model for online competition
     """
-    SPECIFIC_AGENTS[agent_id] = {
-        'create_fn': create_fn,
-        'model_name': model_name,
-        'model_description': model_description
-    }
+    SPECIFIC_AGENTS[agent_id] = AgentSpec(
+        create_fn=create_fn,
+        model_name=model_name,
+        model_description=model_description
+    )
 
 # Register basic Claude 3.7 Sonnet agent
 register_agent(
@@ -65,10 +68,15 @@ def _ensure_mcp_server():
     """Ensure the MCP server is running."""
     global _mcp_server_thread
     if _mcp_server_thread is None:
+        # Imported here so only the agents that need the server pay for loading it
+        import mcp_server
+        
         print("Starting MCP server...")
-        _mcp_server_thread = mcp_server.start_server_thread(port=_mcp_port)
-        time.sleep(2)  # Give the server a moment to start up
-        print("MCP server started")
+        _mcp_server_thread, ready = mcp_server.start_server_thread(port=_mcp_port)
+        if ready.wait(timeout=5.0):
+            print("MCP server started")
+        else:
+            print("MCP server did not report ready within 5 seconds, continuing anyway")
 
 # Register MCP-enhanced Claude 3.7 Sonnet agent
 register_agent(
@@ -93,9 +101,8 @@ register_agent(
 # Register MCP-enhanced Nova Lite agent
 register_agent(
     agent_id='nova-lite-mcp',
-    create_fn=lambda: (_ensure_mcp_server(), create_mcp_agent(
-        model_name="amazon/nova-lite-v1",
-        mcp_server_url=f"http://localhost:{_mcp_port}"
+    create_fn=lambda: (_ensure_mcp_server(), create_dictionary_agent(
+        model_name="amazon/nova-lite-v1"
     ))[1],
     model_name="Amazon-Nova-Lite-MCP-Enhanced",
     model_description="Amazon's Nova Lite v1 model enhanced with MCP word-finding capabilities"
@@ -103,18 +110,21 @@ register_agent(
 # Register MCP-enhanced Claude 3.5 Haiku agent
 register_agent(
     agent_id='claude-3.5-haiku-mcp',
-    create_fn=lambda: (_ensure_mcp_server(), create_mcp_agent(
-        model_name="anthropic/claude-3.5-haiku",
-        mcp_server_url=f"http://localhost:{_mcp_port}"
+    create_fn=lambda: (_ensure_mcp_server(), create_dictionary_agent(
+        model_name="anthropic/claude-3.5-haiku"
     ))[1],
     model_name="Claude-3.5-Haiku-MCP-Enhanced",
     model_description="Anthropic's Claude 3.5 Haiku model enhanced with MCP word-finding capabilities"
 )
 
+@functools.lru_cache(maxsize=None)
 def get_agent(agent_id):
     """
     Get a specific agent by ID.
     
+    Agents are created once per ID and reused by later calls; use
+    reset_agent_cache() to force fresh agents.
+    
     Args:
         agent_id: ID of the agent to get
         
@@ -125,8 +135,12 @@ def get_agent(agent_id):
         raise ValueError(f"Unknown agent ID: {agent_id}. Available agents: {list(SPECIFIC_AGENTS.keys())}")
     
     agent_config = SPECIFIC_AGENTS[agent_id]
-    agent = agent_config['create_fn']()
-    return agent, agent_config['model_name'], agent_config['model_description']
+    agent = agent_config.create_fn()
+    return agent, agent_config.model_name, agent_config.model_description
+
+def reset_agent_cache():
+    """Discard all cached agents, so the next get_agent call creates a new one."""
+    get_agent.cache_clear()
 
 def list_agents():
     """List all available specific agents."""
@@ -0,0 +1,27 @@
+"""
+Letter bitmasks shared by the word finders.
+"""
+
+# Bit used for any character outside a-z, so words containing one never match
+_OTHER_CHAR_BIT = 1 << 26
+
+# Letter bit for every possible byte of a UTF-8 encoded word
+_BYTE_BITS = [1 << (byte - 97) if 97 <= byte <= 122 else _OTHER_CHAR_BIT for byte in range(256)]
+
+def letter_mask(word):
+    """
+    Build a bitmask of the letters used in a word (bit i set for letter chr(97 + i)).
+    
+    Any character outside a-z sets bit 26, so such words never match a set of
+    allowed letters.
+    
+    Args:
+        word: The lowercase word (or string of letters) to encode
+    
+    Returns:
+        int: The letter bitmask
+    """
+    mask = 0
+    for byte in word.encode():
+        mask |= _BYTE_BITS[byte]
+    return mask
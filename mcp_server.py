@@ -1,83 +1,134 @@
 import os
 import re
-import json
-import sys
+import asyncio
 import threading
 import logging
+import functools
 import importlib.resources
 from collections import defaultdict
-import nltk
-from nltk.corpus import words
+import numpy as np
+import orjson
+import uvicorn
 from mcp.server.fastmcp import FastMCP
 import http.server
-import socketserver
 import urllib.parse
 from concurrent.futures import ThreadPoolExecutor
 
-# Configure logging
-logging.basicConfig(
-    level=logging.DEBUG,  # Set to DEBUG to ensure all messages are captured
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    force=True  # Force reconfiguration in case logging was already configured elsewhere
-)
-logger = logging.getLogger('mcp_server')
-logger.setLevel(logging.DEBUG)  # Ensure the logger itself is set to DEBUG level
-
-# Add a console handler to make sure logs are displayed
-console_handler = logging.StreamHandler()
-console_handler.setLevel(logging.DEBUG)
-formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
-console_handler.setFormatter(formatter)
-logger.addHandler(console_handler)
+from letter_masks import letter_mask
 
-# Import the dictionary module
-from dictionary import dictionary, EnglishDictionary
+# Configure logging (handlers and format are left to the application; INFO by
+# default, set MCP_LOGLEVEL=DEBUG to trace every query)
+_LOG_LEVEL = os.environ.get('MCP_LOGLEVEL', 'INFO').upper()
+logger = logging.getLogger('mcp_server')
+logger.setLevel(_LOG_LEVEL)
 
-# Get all English words from the dictionary
-english_words = dictionary.get_all_words()
-logger.info(f"Loaded {len(english_words)} English words from TextArena dictionary")
+@functools.cache
+def _words():
+    """
+    Load the dictionary and build the word index on first use.
+    
+    Importing this module stays cheap; the dictionary is only loaded once a
+    query actually arrives.
+    
+    Returns:
+        tuple: (mask_words, masks) - the words grouped by the set of letters they
+            use, and the letter mask of each group, so queries are a single
+            vectorized pass over the distinct masks rather than every word
+    """
+    # Import the dictionary module
+    from dictionary import dictionary
+    
+    # Get all English words from the dictionary, lowercased once and without words
+    # too short to ever be valid
+    english_words = sorted({word.lower() for word in dictionary.get_all_words() if len(word) >= 4})
+    logger.info(f"Loaded {len(english_words)} English words from TextArena dictionary")
+    
+    # Many words share a letter set, so group them by mask and only test each mask once
+    buckets = defaultdict(list)
+    for word in english_words:
+        buckets[letter_mask(word)].append(word)
+    logger.info(f"Indexed words into {len(buckets)} distinct letter sets")
+    
+    mask_words = tuple(tuple(words) for words in buckets.values())
+    masks = np.fromiter(buckets.keys(), dtype=np.uint32, count=len(buckets))
+    return mask_words, masks
 
 # Create an MCP server
 mcp = FastMCP("SpellingBee Word Finder")
 
+@functools.lru_cache(maxsize=None)
+def _find_by_mask(available_mask):
+    """
+    Find all valid words for a set of available letters, once per unique set.
+    
+    Args:
+        available_mask: Bitmask of the available letters
+        
+    Returns:
+        tuple: Valid words that can be formed
+    """
+    mask_words, masks = _words()
+    disallowed_mask = np.uint32(~available_mask & 0xFFFFFFFF)
+    
+    # A word is valid if it uses no letter outside the available ones
+    valid = np.flatnonzero((masks & disallowed_mask) == 0)
+    return tuple(sorted(word for index in valid.tolist() for word in mask_words[index]))
+
 @mcp.tool()
 def find_words(letters: list[str]) -> list[str]:
     """
     Find all valid English words that can be formed using the given letters.
     
+    Letters may be reused any number of times, so only the set of letters a word
+    uses matters, not how often each one appears.
+    
     Args:
         letters: List of available letters
         
     Returns:
         list: Valid words that can be formed
     """
-    logger.info(f"Finding words with letters: {letters}")
+    logger.debug("Finding words with letters: %s", letters)
     
-    # Convert all letters to lowercase for case-insensitive matching
-    letters = [letter.lower() for letter in letters]
+    # Convert all letters to lowercase for case-insensitive matching; repeat
+    # queries for the same letter set are served from the cache
+    valid_words = list(_find_by_mask(letter_mask("".join(letters).lower())))
     
-    # Find all valid words
-    valid_words = []
-    for word in english_words:
-        # Skip words that are too short
-        if len(word) < 4:
-            continue
-        
-        # Check if all letters in the word are in the available letters
-        valid = True
-        for letter in word:
-            if letter not in letters:
-                valid = False
-                break
+    logger.debug("Found %d valid words", len(valid_words))
+    return valid_words
+
+@functools.lru_cache(maxsize=512)
+def _find_words_response(letters_param):
+    """
+    Build the JSON body for a /find_words request, once per unique query value.
+    
+    Args:
+        letters_param: The raw comma-separated letters query parameter
         
-        if valid:
-            valid_words.append(word)
+    Returns:
+        bytes: The encoded JSON list of words
+    """
+    # Parse the letters (comma-separated list)
+    letters = letters_param.split(',')
     
-    logger.info(f"Found {len(valid_words)} valid words")
-    return valid_words
+    # Call the find_words function
+    logger.debug("HTTP request to find_words: letters=%s", letters)
+    words = find_words(letters)
+    return orjson.dumps(words)
 
 # Create a simple HTTP server to expose the find_words function
 class FindWordsHandler(http.server.BaseHTTPRequestHandler):
+    # Keep connections alive between requests; every response sends Content-Length
+    protocol_version = "HTTP/1.1"
+    
+    def _send(self, status, content_type, body):
+        """Send a complete response with an explicit Content-Length."""
+        self.send_response(status)
+        self.send_header('Content-type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+    
     def do_GET(self):
         try:
             # Parse the URL path and query parameters
@@ -91,39 +142,26 @@ class FindWordsHandler(http.server.BaseHTTPRequestHandler):
                 # Get the letters from the query parameters
                 letters_param = query_params.get('letters', [''])[0]
                 
-                # Parse the letters (comma-separated list)
-                letters = letters_param.split(',')
-                
-                # Call the find_words function
-                logger.info(f"HTTP request to find_words: letters={letters}")
-                words = find_words(letters)
+                # Find the words (identical queries skip the lookup and JSON encoding)
+                payload = _find_words_response(letters_param)
                 
                 # Return the results as JSON
-                self.send_response(200)
-                self.send_header('Content-type', 'application/json')
-                self.end_headers()
-                self.wfile.write(json.dumps(words).encode())
+                self._send(200, 'application/json', payload)
                 return
                 
             # If not a recognized endpoint, return 404
-            self.send_response(404)
-            self.send_header('Content-type', 'text/plain')
-            self.end_headers()
-            self.wfile.write(b'Not Found')
+            self._send(404, 'text/plain', b'Not Found')
             
         except Exception as e:
             logger.error(f"Error handling HTTP request: {str(e)}")
-            self.send_response(500)
-            self.send_header('Content-type', 'text/plain')
-            self.end_headers()
-            self.wfile.write(f"Error: {str(e)}".encode())
+            self._send(500, 'text/plain', f"Error: {str(e)}".encode())
 
 def start_http_server(port=8080):
     """Start a simple HTTP server to expose the find_words function."""
     logger.info(f"Starting HTTP server on port {port}")
     
     # Create the HTTP server
-    httpd = socketserver.ThreadingTCPServer(("", port), FindWordsHandler)
+    httpd = http.server.ThreadingHTTPServer(("", port), FindWordsHandler)
     
     # Start the server in a background thread
     server_thread = threading.Thread(target=httpd.serve_forever)
@@ -133,31 +171,59 @@ def start_http_server(port=8080):
     logger.info(f"HTTP server running on port {port}")
     return httpd
 
-def start_server_thread(host='0.0.0.0', port=8000):
-    """Start the MCP server in a background thread."""
-    logger.info(f"Starting MCP server in background thread")
+def start_server_thread(host='127.0.0.1', port=8000):
+    """
+    Start the MCP server in-process on a background thread.
+    
+    Args:
+        host: Interface to listen on
+        port: Port to listen on
+        
+    Returns:
+        tuple: (server_thread, ready) - ready is a threading.Event that is set
+            once the server is accepting connections
+    """
+    logger.info(f"Starting MCP server in background thread on {host}:{port}")
     
-    # Create a command to run the MCP server using the CLI
-    cmd = f"mcp run {__file__}"
+    # Serve from this process (rather than spawning `mcp run`), so the word
+    # index is loaded once and shared with the HTTP handler
+    mcp.settings.host = host
+    mcp.settings.port = port
+    ready = threading.Event()
+    
+    async def serve():
+        # Same setup as FastMCP.run_sse_async, but keeping the server so we can
+        # tell callers when it has actually bound its socket
+        config = uvicorn.Config(
+            mcp.sse_app(),
+            host=mcp.settings.host,
+            port=mcp.settings.port,
+            log_level=mcp.settings.log_level.lower(),
+        )
+        server = uvicorn.Server(config)
+        serve_task = asyncio.create_task(server.serve())
+        while not server.started and not serve_task.done():
+            await asyncio.sleep(0.01)
+        if server.started:
+            logger.info(f"MCP server listening on {host}:{port}")
+            ready.set()
+        await serve_task
     
     def run_server():
-        logger.info(f"Running command: {cmd}")
-        os.system(cmd)
+        asyncio.run(serve())
     
     server_thread = threading.Thread(target=run_server)
     server_thread.daemon = True
     server_thread.start()
-    return server_thread
+    return server_thread, ready
 
 if __name__ == '__main__':
-    # If run directly, start the server
-    if 'mcp' in sys.modules:
-        # If being run by the MCP CLI, just define the server
-        logger.info("Running via MCP CLI")
-        
-        # Also start the HTTP server for direct access
-        start_http_server(port=8080)
-    else:
-        # If run directly, use the CLI to start the server
-        logger.info("Running directly, starting server via CLI")
-        os.system(f"mcp run {__file__}")
+    # If run directly, expose find_words over HTTP for direct access, then serve
+    # MCP over stdio in this process (what `mcp run` would do) until the client exits
+    logging.basicConfig(
+        level=_LOG_LEVEL,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+    logger.info("Running directly, starting servers")
+    start_http_server(port=8080)
+    mcp.run()
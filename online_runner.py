@@ -3,11 +3,61 @@ from agents import get_agent
 import time
 import logging
 import re
+from concurrent.futures import ThreadPoolExecutor
+import requests
+import websockets.exceptions
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger('online_runner')
 
+# Matches the first word in brackets in an agent's response
+_BRACKET_RE = re.compile(r'\[([^\]\n]*)\]')
+
+# Connection problems worth retrying; anything else is raised immediately
+_RETRYABLE_ERRORS = (
+    websockets.exceptions.WebSocketException,
+    TimeoutError,
+    ConnectionError,
+    requests.exceptions.ConnectionError,
+    requests.exceptions.Timeout,
+)
+
+# Worker threads for running the agent and building the next environment side by side
+_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='online_runner')
+
+def _build_env(env_id, model_name, model_description, email):
+    """
+    Create a wrapped online environment; the game connection is opened by reset().
+    
+    Args:
+        env_id: ID (or list of IDs) of the environment to play
+        model_name: Name of the model for online competition
+        model_description: Description of the model for online competition
+        email: Email address for registration
+        
+    Returns:
+        The wrapped environment
+    """
+    env = ta.make_online(
+        env_id=env_id,
+        model_name=model_name,
+        model_description=model_description,
+        email=email
+    )
+    return ta.wrappers.LLMObservationWrapper(env=env)
+
+def _generate_action_and_env(agent, observation, env_id, model_name, model_description, email):
+    """
+    Run the agent and build the next environment concurrently.
+    
+    Returns:
+        tuple: (action, env)
+    """
+    action_future = _executor.submit(agent, observation)
+    env_future = _executor.submit(_build_env, env_id, model_name, model_description, email)
+    return action_future.result(), env_future.result()
+
 def run_online_game(agent_id='claude-3.7-sonnet-mcp', email="j.beck@startmunich.de", verbose=True, max_retries=10, retry_delay=5):
     """
     Run an online SpellingBee game with a single agent.
@@ -34,13 +84,7 @@ def run_online_game(agent_id='claude-3.7-sonnet-mcp', email="j.beck@startmunich.
             # This way we can generate the action before opening the WebSocket connection
             
             # Create a temporary environment just to get the observation
-            temp_env = ta.make_online(
-                env_id="SpellingBee-v0",
-                model_name=model_name,
-                model_description=model_description,
-                email=email
-            )
-            temp_env = ta.wrappers.LLMObservationWrapper(env=temp_env)
+            temp_env = _build_env("SpellingBee-v0", model_name, model_description, email)
             
             # Start the game and get the observation
             temp_env.reset(num_players=1)
@@ -52,31 +96,31 @@ def run_online_game(agent_id='claude-3.7-sonnet-mcp', email="j.beck@startmunich.
             except:
                 logger.warning("Error closing temporary environment, continuing anyway")
             
-            # Generate the action BEFORE creating the real environment
-            # This is the key change - we generate the action while no WebSocket is open
+            # Generate the action BEFORE connecting the real environment
+            # This is the key change - we generate the action while no WebSocket is open,
+            # building the next environment in parallel so it is ready when the action is
             logger.info("Generating action from agent (this may take some time)...")
-            action = agent(observation)
+            action, env = _generate_action_and_env(
+                agent,
+                observation,
+                ["SpellingBee-v0", "Nim-v0", "Snake-v0", "TruthAndDeception-v0", "Poker-v0", "SimpleNegotiation-v0"],
+                model_name,
+                model_description,
+                email
+            )
             
             # Extract just the word in brackets
-            bracket_pattern = r'\[(.*?)\]'
-            matches = re.findall(bracket_pattern, action)
+            match = _BRACKET_RE.search(action)
             
-            if matches:
-                clean_action = f"[{matches[0]}]"
+            if match:
+                clean_action = f"[{match.group(1)}]"
                 logger.info(f"Extracted word from response: {clean_action}")
             else:
                 clean_action = action
                 logger.warning("Could not extract word in brackets from response")
             
-            # NOW create the real environment and submit the action immediately
-            logger.info("Creating new environment to submit action...")
-            env = ta.make_online(
-                env_id=["SpellingBee-v0", "Nim-v0", "Snake-v0", "TruthAndDeception-v0", "Poker-v0", "SimpleNegotiation-v0"],
-                model_name=model_name,
-                model_description=model_description,
-                email=email
-            )
-            env = ta.wrappers.LLMObservationWrapper(env=env)
+            # NOW connect the real environment and submit the action immediately
+            logger.info("Connecting new environment to submit action...")
             
             # Reset and immediately submit the action
             env.reset(num_players=1)
@@ -100,29 +144,25 @@ def run_online_game(agent_id='claude-3.7-sonnet-mcp', email="j.beck@startmunich.
                     except:
                         logger.warning("Error closing environment, continuing anyway")
                     
-                    # Generate action offline (no WebSocket open)
+                    # Generate action offline (no WebSocket open), building the next
+                    # environment in parallel
                     logger.info("Generating action from agent (this may take some time)...")
-                    action = agent(observation)
+                    action, env = _generate_action_and_env(
+                        agent, observation, "SpellingBee-v0", model_name, model_description, email
+                    )
                     
                     # Extract just the word in brackets
-                    matches = re.findall(bracket_pattern, action)
+                    match = _BRACKET_RE.search(action)
                     
-                    if matches:
-                        clean_action = f"[{matches[0]}]"
+                    if match:
+                        clean_action = f"[{match.group(1)}]"
                         logger.info(f"Extracted word from response: {clean_action}")
                     else:
                         clean_action = action
                         logger.warning("Could not extract word in brackets from response")
                     
-                    # Create new environment to submit action
-                    logger.info("Creating new environment to submit action...")
-                    env = ta.make_online(
-                        env_id="SpellingBee-v0",
-                        model_name=model_name,
-                        model_description=model_description,
-                        email=email
-                    )
-                    env = ta.wrappers.LLMObservationWrapper(env=env)
+                    # Connect the new environment to submit action
+                    logger.info("Connecting new environment to submit action...")
                     
                     # Reset and skip to the current game state
                     env.reset(num_players=1)
@@ -136,7 +176,7 @@ def run_online_game(agent_id='claude-3.7-sonnet-mcp', email="j.beck@startmunich.
                     
                 except Exception as e:
                     logger.error(f"Error during game step: {str(e)}")
-                    if "websocket" in str(e).lower() or "timeout" in str(e).lower() or "connection" in str(e).lower():
+                    if isinstance(e, _RETRYABLE_ERRORS):
                         # Try to recover by waiting a bit and continuing
                         logger.info("Connection issue detected. Waiting before continuing...")
                         time.sleep(retry_delay)
@@ -154,7 +194,7 @@ def run_online_game(agent_id='claude-3.7-sonnet-mcp', email="j.beck@startmunich.
         except Exception as e:
             logger.error(f"Error running online game: {str(e)}")
             
-            if "websocket" in str(e).lower() or "timeout" in str(e).lower() or "connection" in str(e).lower():
+            if isinstance(e, _RETRYABLE_ERRORS):
                 if attempt < max_retries - 1:
                     logger.info(f"Connection issue detected. Retrying in {retry_delay} seconds...")
                     time.sleep(retry_delay)
@@ -0,0 +1,36 @@
+"""
+On-disk pickle caches shared by the word indexes.
+"""
+import os
+import pickle
+import tempfile
+
+def write_pickle_atomic(path, obj):
+    """
+    Pickle an object to a file, replacing it atomically.
+    
+    The object is written to a uniquely named temporary file in the same
+    directory first, so concurrent writers never clobber each other and
+    readers never see a partial file. The temporary file is removed if
+    writing fails.
+    
+    Args:
+        path: The cache file to write
+        obj: The object to pickle
+    
+    Raises:
+        OSError, pickle.PicklingError: If the file could not be written
+    """
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            pickle.dump(obj, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temp_path, path)
+    except BaseException:
+        try:
+            os.unlink(temp_path)
+        except OSError:
+            pass
+        raise
@@ -2,6 +2,7 @@
 Test script for the game-specific agent to verify its behavior for different game types.
 """
 import os
+import re
 import logging
 import sys
 from dotenv import load_dotenv
@@ -19,6 +20,12 @@ sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 # Import directly from the file to avoid dependency issues
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
+# Keywords identifying each game type, matched case-insensitively in a single pass
+_GAME_TYPE_RE = re.compile(
+    r"(?P<spelling_bee>spelling bee|allowed letters)|(?P<poker>poker|texas hold|cards:)",
+    re.IGNORECASE,
+)
+
 # Create a simplified version of the game-specific agent for testing
 def create_test_agent():
     """
@@ -35,21 +42,20 @@ def create_test_agent():
         Returns:
             str: The detected game type ('spelling_bee', 'poker', or 'other')
         """
-        observation_lower = observation.lower()
+        # Scan the observation once; Spelling Bee keywords take precedence over Poker ones
+        game_type = 'other'
+        for match in _GAME_TYPE_RE.finditer(observation):
+            game_type = match.lastgroup
+            if game_type == 'spelling_bee':
+                break
         
-        # Check for Spelling Bee indicators
-        if 'spelling bee' in observation_lower or 'allowed letters' in observation_lower:
+        if game_type == 'spelling_bee':
             logger.info("Detected game type: Spelling Bee")
-            return 'spelling_bee'
-        
-        # Check for Poker indicators
-        if 'poker' in observation_lower or 'texas hold' in observation_lower or 'cards:' in observation_lower:
+        elif game_type == 'poker':
             logger.info("Detected game type: Poker")
-            return 'poker'
-        
-        # Default to other
-        logger.info("Detected game type: Other (unknown game)")
-        return 'other'
+        else:
+            logger.info("Detected game type: Other (unknown game)")
+        return game_type
     
     def agent(observation):
         """
@@ -6,126 +6,358 @@ import os
 import sys
 import logging
 import asyncio
-import json
+import orjson
+import pickle
+import threading
+import weakref
+import functools
+import itertools
+from collections import defaultdict
 import aiohttp
-import traceback
-import nltk
+import numpy as np
+
+from letter_masks import letter_mask
+from pickle_cache import write_pickle_atomic
 
 # Configure logging
 logging.basicConfig(
-    level=logging.DEBUG,
+    level=logging.INFO,
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
     force=True
 )
 logger = logging.getLogger('mcp_test')
-logger.setLevel(logging.DEBUG)
+logger.setLevel(logging.INFO)  # Set to DEBUG to trace each request
+
+# Shared HTTP session per event loop, so repeated requests reuse pooled keep-alive
+# connections (a session cannot outlive the loop it was created on)
+_sessions = weakref.WeakKeyDictionary()
+
+async def get_session():
+    """
+    Get the shared aiohttp session of the running event loop, creating it on first use.
+    
+    Returns:
+        aiohttp.ClientSession: The shared session
+    """
+    loop = asyncio.get_running_loop()
+    session = _sessions.get(loop)
+    if session is None or session.closed:
+        session = _sessions[loop] = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=100, keepalive_timeout=60),
+            # Give up on a dead or hung server instead of waiting indefinitely
+            timeout=aiohttp.ClientTimeout(total=10, connect=2),
+        )
+    return session
+
+def _sort_by_length(words):
+    """
+    Order words longest first, keeping the original order within each length.
+    
+    Word lengths span a small range, so a bucket sort on length does this in a
+    single linear pass instead of a comparison sort.
+    
+    Args:
+        words: The list of words (strings) to order
+        
+    Returns:
+        list: The words, longest first
+    """
+    if not words:
+        return []
+    buckets = [[] for _ in range(max(map(len, words)) + 1)]
+    for word in words:
+        buckets[len(word)].append(word)
+    return [word for bucket in reversed(buckets) for word in bucket]
+
+# Headers for the pre-encoded JSON-RPC request bodies
+_JSON_HEADERS = {"Content-Type": "application/json"}
+
+@functools.lru_cache(maxsize=256)
+def _payload_bytes(letters):
+    """
+    Encode the find_words JSON-RPC request for a sequence of letters.
+    
+    Args:
+        letters: Tuple of available letters
+        
+    Returns:
+        bytes: The encoded request body
+    """
+    payload = {
+        "jsonrpc": "2.0",
+        "id": 1,
+        "method": "call_tool",
+        "params": {
+            "name": "find_words",
+            "input": {
+                "letters": list(letters)
+            }
+        }
+    }
+    return orjson.dumps(payload)
 
-async def find_words_with_mcp(letters, mcp_server_url):
+# Words found by the MCP server per letter set, oldest entries evicted first
+_RESULTS_CACHE_SIZE = 256
+_results_cache = {}
+
+# [lock, users] per letter set with a lookup in progress, so concurrent identical
+# lookups share a single request; removed once its last user is done
+_results_locks = {}
+
+async def find_words_with_mcp(letters, mcp_server_url, session=None):
     """
     Use HTTP requests to find all possible words through the MCP server.
     If the MCP server is unavailable, fall back to using NLTK directly.
     
+    Results from the server are cached per set of letters.
+    
     Args:
         letters: List of available letters
         mcp_server_url: URL of the MCP server
+        session: aiohttp session to send the request with (defaults to the shared one)
         
     Returns:
         list: Valid words that can be formed
     """
+    key = frozenset("".join(letters).lower())
+    lock_entry = _results_locks.setdefault(key, [asyncio.Lock(), 0])
+    lock_entry[1] += 1
     try:
-        print(f"Finding words with MCP: letters={letters}")
-        
-        # Create the JSON-RPC request payload
-        payload = {
-            "jsonrpc": "2.0",
-            "id": 1,
-            "method": "call_tool",
-            "params": {
-                "name": "find_words",
-                "input": {
-                    "letters": letters
-                }
-            }
-        }
-        
-        # Make the HTTP request to the MCP server
-        async with aiohttp.ClientSession() as session:
-            # The MCP server expects JSON-RPC requests at the /jsonrpc endpoint
-            print(f"Making request to: {mcp_server_url}/jsonrpc")
-            async with session.post(f"{mcp_server_url}/jsonrpc", json=payload) as response:
-                if response.status == 200:
-                    result_json = await response.json()
-                    print(f"MCP response received")
-                    
-                    if "result" in result_json:
-                        words = result_json["result"]
-                        print(f"MCP found {len(words)} total words")
-                        
-                        # Sort words by length (longer words first for higher points)
-                        words.sort(key=len, reverse=True)
-                        
-                        return words
-                    elif "error" in result_json:
-                        print(f"MCP error: {result_json['error']}")
-                        print("Falling back to direct dictionary filtering")
-                        return find_words_fallback(letters)
-                    else:
-                        print("MCP returned an unexpected response format")
-                        print("Falling back to direct dictionary filtering")
-                        return find_words_fallback(letters)
-                else:
-                    print(f"HTTP error: {response.status}")
-                    response_text = await response.text()
-                    print(f"Response: {response_text}")
-                    print("Falling back to direct dictionary filtering")
-                    return find_words_fallback(letters)
+        async with lock_entry[0]:
+            if key in _results_cache:
+                logger.debug("Using cached MCP result for letters=%s", letters)
+                return list(_results_cache[key])
             
-    except Exception as e:
-        print(f"Error calling MCP: {str(e)}")
-        print(traceback.format_exc())
-        print("Falling back to direct dictionary filtering")
-        return find_words_fallback(letters)
+            words, from_server = await _query_mcp(letters, mcp_server_url, session)
+            
+            # Only cache server answers, so a fallback result is not kept once the server is back
+            if from_server:
+                if len(_results_cache) >= _RESULTS_CACHE_SIZE:
+                    del _results_cache[next(iter(_results_cache))]
+                _results_cache[key] = tuple(words)
+            return words
+    finally:
+        lock_entry[1] -= 1
+        if not lock_entry[1]:
+            del _results_locks[key]
 
-def find_words_fallback(letters):
+async def _query_mcp(letters, mcp_server_url, session):
     """
-    Fallback method to find words using NLTK directly.
+    Send a find_words request to the MCP server, falling back to NLTK on failure.
     
     Args:
         letters: List of available letters
+        mcp_server_url: URL of the MCP server
+        session: aiohttp session to send the request with (None for the shared one)
         
     Returns:
-        list: Valid words that can be formed
+        tuple: (words, from_server) - the valid words, and whether the MCP server
+            provided them
     """
-    print("Using fallback method with NLTK")
+    # Look the words up in the dictionary alongside the request, so a slow or
+    # failed MCP call does not then also wait for the word list to load
+    fallback_task = asyncio.create_task(find_words_fallback_async(letters))
     
-    # Create a set of valid letters (lowercase)
-    valid_letters = set(letter.lower() for letter in letters)
+    try:
+        logger.debug("Finding words with MCP: letters=%s", letters)
+        
+        # Create the JSON-RPC request payload (encoded once per letter sequence)
+        payload = _payload_bytes(tuple(letters))
+        
+        # Make the HTTP request to the MCP server
+        if session is None:
+            session = await get_session()
+        
+        # The MCP server expects JSON-RPC requests at the /jsonrpc endpoint
+        logger.debug("Making request to: %s/jsonrpc", mcp_server_url)
+        response = await session.post(f"{mcp_server_url}/jsonrpc", data=payload, headers=_JSON_HEADERS)
+        try:
+            # Non-2xx statuses raise ClientResponseError and fall back below
+            response.raise_for_status()
+            body = await response.read()
+        finally:
+            response.release()
+        
+        result_json = orjson.loads(body)
+        logger.debug("MCP response received")
+        
+        if "result" in result_json:
+            words = result_json["result"]
+            if not isinstance(words, list) or not all(isinstance(word, str) for word in words):
+                logger.warning("MCP returned a result that is not a list of words")
+                logger.warning("Falling back to direct dictionary filtering")
+                return await fallback_task, False
+            logger.debug("MCP found %d total words", len(words))
+            
+            # Sort words by length (longer words first for higher points)
+            words = _sort_by_length(words)
+            
+            # Only now is the fallback not needed (its thread still finishes and warms the cache)
+            fallback_task.cancel()
+            return words, True
+        elif "error" in result_json:
+            logger.warning("MCP error: %s", result_json['error'])
+            logger.warning("Falling back to direct dictionary filtering")
+            return await fallback_task, False
+        else:
+            logger.warning("MCP returned an unexpected response format")
+            logger.warning("Falling back to direct dictionary filtering")
+            return await fallback_task, False
     
-    # Filter words from nltk corpus
+    except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+        logger.warning("MCP request failed: %s", e)
+        logger.warning("Falling back to direct dictionary filtering")
+        return await fallback_task, False
+    except Exception:
+        logger.exception("Error calling MCP")
+        logger.warning("Falling back to direct dictionary filtering")
+        return await fallback_task, False
+
+# On-disk copy of the word buckets, so later runs skip NLTK entirely
+_WORDS_CACHE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "nltk_word_buckets.pkl")
+
+def _build_word_buckets():
+    """
+    Build the word buckets from the NLTK English word list.
+    
+    Returns:
+        dict: Maps the frozenset of letters a word uses to the tuple of distinct
+            lowercased words using exactly those letters (words too short to be
+            valid are left out)
+    """
+    # Imported here so runs served by the MCP server or the cache never load NLTK
+    import nltk
     nltk.download('words', quiet=True)
     from nltk.corpus import words as nltk_words
     
-    # Get all English words
-    english_words = set(word.lower() for word in nltk_words.words())
+    # Lowercase the whole corpus in one call rather than word by word
+    english_words = {word for word in "\n".join(nltk_words.words()).lower().split("\n") if len(word) >= 4}
     
-    # Filter words
-    valid_words = []
+    buckets = defaultdict(list)
     for word in english_words:
-        # Skip words that are too short
-        if len(word) < 4:
-            continue
+        buckets[frozenset(word)].append(word)
+    return {word_letters: tuple(words) for word_letters, words in buckets.items()}
+
+# Fallback lookups run in worker threads; only the first one may build the buckets
+_word_buckets_lock = threading.Lock()
+
+def _word_buckets():
+    """
+    Get the word buckets, loading them on first use (safe to call from several threads).
+    
+    Returns:
+        dict: The word buckets, see _build_word_buckets
+    """
+    with _word_buckets_lock:
+        return _load_word_buckets()
+
+@functools.lru_cache(maxsize=1)
+def _load_word_buckets():
+    """
+    Load the word buckets once per process, from the on-disk cache if it is fresh.
+    
+    The cache is stale if this script is newer than it (the NLTK corpus itself
+    does not change).
+    
+    Returns:
+        dict: The word buckets, see _build_word_buckets
+    """
+    if os.path.exists(_WORDS_CACHE_PATH):
+        try:
+            if os.path.getmtime(__file__) <= os.path.getmtime(_WORDS_CACHE_PATH):
+                with open(_WORDS_CACHE_PATH, "rb") as f:
+                    return pickle.load(f)
+        except Exception as e:
+            logger.warning(f"Could not load cached word list: {str(e)}")
+    
+    buckets = _build_word_buckets()
+    
+    try:
+        write_pickle_atomic(_WORDS_CACHE_PATH, buckets)
+    except Exception as e:
+        logger.warning(f"Could not save word list cache: {str(e)}")
+    
+    return buckets
+
+@functools.lru_cache(maxsize=1)
+def _bucket_masks():
+    """
+    Build the letter mask of every word bucket once per process.
+    
+    Returns:
+        tuple: (bucket_words, masks) - the words of each bucket, and the letter
+            mask of each bucket as a NumPy array in the same order
+    """
+    buckets = _word_buckets()
+    bucket_words = tuple(buckets.values())
+    masks = np.fromiter((letter_mask("".join(word_letters)) for word_letters in buckets), dtype=np.uint32, count=len(buckets))
+    return bucket_words, masks
+
+@functools.lru_cache(maxsize=128)
+def _find_words_for_letters(valid_letters):
+    """
+    Find all valid words for a set of letters, once per unique set.
+    
+    Args:
+        valid_letters: Frozenset of available lowercase letters
         
-        # Check if all letters in the word are in the available letters
-        if all(letter in valid_letters for letter in word):
-            valid_words.append(word)
+    Returns:
+        tuple: Valid words that can be formed, longest first
+    """
+    buckets = _word_buckets()
+    valid_words = []
     
-    print(f"Found {len(valid_words)} valid words using fallback method")
+    if 2 ** len(valid_letters) <= len(buckets):
+        # Few letters (e.g. the 7 of a Spelling Bee): look up each subset of them
+        letters = sorted(valid_letters)
+        for size in range(1, len(letters) + 1):
+            for subset in itertools.combinations(letters, size):
+                valid_words.extend(buckets.get(frozenset(subset), ()))
+    else:
+        # Many letters: testing each distinct letter set is cheaper, in one
+        # vectorized pass over the bucket masks
+        bucket_words, masks = _bucket_masks()
+        disallowed_mask = np.uint32(~letter_mask("".join(valid_letters)) & 0xFFFFFFFF)
+        for index in np.flatnonzero((masks & disallowed_mask) == 0).tolist():
+            valid_words.extend(bucket_words[index])
     
     # Sort words by length (longer words first for higher points)
-    valid_words.sort(key=len, reverse=True)
+    return tuple(_sort_by_length(valid_words))
+
+def find_words_fallback(letters):
+    """
+    Fallback method to find words using NLTK directly.
+    
+    Args:
+        letters: List of available letters
+        
+    Returns:
+        list: Valid words that can be formed
+    """
+    logger.debug("Using fallback method with NLTK")
+    
+    # Create a set of valid letters (lowercase)
+    valid_letters = frozenset("".join(letters).lower())
+    
+    # Filter words (the word list is loaded once, and repeat letter sets are cached)
+    valid_words = list(_find_words_for_letters(valid_letters))
+    
+    logger.debug("Found %d valid words using fallback method", len(valid_words))
     
     return valid_words
 
+async def find_words_fallback_async(letters):
+    """
+    Run find_words_fallback in a worker thread, so loading the word list does not block the event loop.
+    
+    Args:
+        letters: List of available letters
+        
+    Returns:
+        list: Valid words that can be formed
+    """
+    return await asyncio.to_thread(find_words_fallback, letters)
+
 async def main_async():
     """Test the MCP agent's word-finding capability asynchronously."""
     # Test letters for the SpellingBee game
@@ -138,8 +370,12 @@ async def main_async():
     
     print(f"Testing MCP word-finding with letters: {letters}")
     
-    # Find words using the MCP client
-    words = await find_words_with_mcp(letters, mcp_server_url)
+    # Find words using the MCP client, over one session for the whole run
+    session = await get_session()
+    try:
+        words = await find_words_with_mcp(letters, mcp_server_url, session)
+    finally:
+        await session.close()
     
     # Display the results
     if words: